@@ -10,13 +10,38 @@ The server receives webcam frames via WebSocket and emits status updates in real
 """
 
 import base64
+import hashlib
+import logging
 import os
+import queue
+import threading
+import time
+
+# Optional CPU pinning for inference (Linux), e.g. INFERENCE_CPUS="0,1".
+# Thread-pool sizes must be capped before numpy/OpenCV/MediaPipe are imported,
+# so their workers don't oversubscribe the pinned cores. The affinity itself
+# is applied below, once logging is configured.
+INFERENCE_CPUS_ERROR = None
+try:
+    INFERENCE_CPUS = [int(cpu) for cpu in os.environ.get('INFERENCE_CPUS', '').split(',') if cpu.strip()]
+except ValueError as e:
+    # Reported once logging is configured; run unpinned
+    INFERENCE_CPUS = []
+    INFERENCE_CPUS_ERROR = e
+if INFERENCE_CPUS:
+    for var in ('OMP_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS', 'NUMBA_NUM_THREADS'):
+        os.environ.setdefault(var, str(len(INFERENCE_CPUS)))
+
 import cv2
 import numpy as np
 import mediapipe as mp
 import bcrypt
+import orjson
+from collections import OrderedDict
 from datetime import timedelta
+from eventlet import tpool
 from flask import Flask, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_socketio import SocketIO, emit, disconnect
 from flask_cors import CORS
 from flask_jwt_extended import (
@@ -24,8 +49,82 @@ from flask_jwt_extended import (
     get_jwt_identity, verify_jwt_in_request
 )
 
+# Optional: PyTurboJPEG decodes JPEG straight to RGB, faster than cv2.imdecode
+# followed by a BGR->RGB conversion. Falls back to OpenCV if the package or the
+# native libturbojpeg library is not available.
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    turbo_jpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    turbo_jpeg = None
+
+# Optional: Numba compiles the per-frame geometry (EAR, MAR, head pose) to
+# native code. Falls back to the NumPy implementations when not installed.
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Logging - WARNING by default so per-connection/per-request messages don't
+# block the event loop with stdout writes under load (set LOG_LEVEL=INFO to see them)
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'WARNING').upper())
+logger = logging.getLogger(__name__)
+
+# Pin the process to INFERENCE_CPUS so MediaPipe's inference threads stay on
+# the same cores and keep their caches warm instead of migrating. MediaPipe
+# creates its threads internally, so the whole process is pinned.
+# INFERENCE_NICE optionally changes scheduling priority (negative values
+# raise it and usually need elevated privileges).
+if INFERENCE_CPUS_ERROR is not None:
+    logger.warning("Invalid INFERENCE_CPUS, running unpinned: %s", INFERENCE_CPUS_ERROR)
+if INFERENCE_CPUS:
+    cv2.setNumThreads(len(INFERENCE_CPUS))
+    try:
+        os.sched_setaffinity(0, INFERENCE_CPUS)
+    except (AttributeError, OSError) as e:
+        logger.warning("Could not pin to CPUs %s: %s", INFERENCE_CPUS, e)
+if os.environ.get('INFERENCE_NICE'):
+    try:
+        os.nice(int(os.environ['INFERENCE_NICE']))
+    except (ValueError, OSError) as e:
+        logger.warning("Could not change process priority: %s", e)
+
+# =============================================================================
+# JSON ENCODING (orjson)
+# =============================================================================
+# orjson is several times faster than the stdlib json module, which matters
+# for the small status payloads emitted on every frame for every client.
+
+class OrjsonModule:
+    """
+    Stand-in for the json module used by Socket.IO/Engine.IO packets.
+    
+    They call json.dumps(data, separators=...) and json.loads(data);
+    orjson output is always compact, so extra keyword arguments are ignored.
+    """
+    
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+    
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider (jsonify, request.get_json) backed by OrjsonModule."""
+    
+    def dumps(self, obj, **kwargs):
+        return OrjsonModule.dumps(obj, **kwargs)
+    
+    def loads(self, s, **kwargs):
+        return OrjsonModule.loads(s, **kwargs)
+
+
 # Initialize Flask app with CORS support
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'wbms_secret_key_dev')
 app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'wbms_jwt_secret_key_dev')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
@@ -38,30 +137,156 @@ CORS(app, origins=cors_origins, supports_credentials=True)
 jwt = JWTManager(app)
 
 # Initialize Socket.IO with eventlet for async support
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet', json=OrjsonModule)
 
 # =============================================================================
 # IN-MEMORY USER STORAGE (Use a database in production!)
 # =============================================================================
 # Simple dict to store users: { email: { 'password_hash': '...', 'name': '...' } }
 users_db = {}
+# Guards check-then-insert on users_db (single get() reads are atomic)
+users_lock = threading.Lock()
+
+# bcrypt work factor for new password hashes (each +1 doubles the cost).
+# The library default is 12 (~250 ms per hash); 10 (~60 ms) is a reasonable
+# tradeoff for this in-memory, classroom-scale store. Raise it for a real
+# deployment with persistent accounts. Existing hashes keep their own cost.
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '10'))
+
+# Short-lived cache of bcrypt check results, so login retry loops from the UI
+# don't re-run a full bcrypt check each time. Keyed by (email, sha256(password))
+# so plaintext passwords are never stored. Never log the cache keys.
+LOGIN_CACHE_TTL = 60       # Seconds a cached result stays valid
+LOGIN_CACHE_SIZE = 1024    # Max entries, least recently used evicted first
+login_cache = OrderedDict()  # key -> (expires_at, ok)
+login_cache_lock = threading.Lock()
+
 
-# Initialize MediaPipe Face Mesh - LAZY LOADING to reduce memory on startup
-# Face Mesh provides 468 facial landmarks for precise face tracking
+def check_password(email, password, password_hash):
+    """
+    Verify a password against a user's bcrypt hash, with a short TTL cache.
+    
+    Args:
+        email: Normalized user email
+        password: Plaintext password from the request
+        password_hash: Stored bcrypt hash for the user
+    
+    Returns:
+        bool: True if the password matches
+    """
+    key = (email, hashlib.sha256(password.encode('utf-8')).hexdigest())
+    now = time.monotonic()
+    
+    with login_cache_lock:
+        entry = login_cache.get(key)
+        if entry is not None and entry[0] > now:
+            login_cache.move_to_end(key)
+            return entry[1]
+    
+    # bcrypt runs off the eventlet hub, see register()
+    ok = tpool.execute(bcrypt.checkpw, password.encode('utf-8'), password_hash)
+    
+    with login_cache_lock:
+        login_cache[key] = (now + LOGIN_CACHE_TTL, ok)
+        login_cache.move_to_end(key)
+        while len(login_cache) > LOGIN_CACHE_SIZE:
+            login_cache.popitem(last=False)
+    
+    return ok
+
+# MediaPipe Face Mesh - one instance PER CONNECTION, created when a client
+# connects (nothing is loaded on startup). Face Mesh provides 468 facial
+# landmarks and tracks the face across frames; sharing one instance between
+# clients would interleave their frames, break tracking and force the face
+# detector to re-run on every frame.
 mp_face_mesh = mp.solutions.face_mesh
-face_mesh = None  # Will be initialized on first use
-
-def get_face_mesh():
-    """Lazy initialization of MediaPipe Face Mesh to reduce memory on startup."""
-    global face_mesh
-    if face_mesh is None:
-        face_mesh = mp_face_mesh.FaceMesh(
-            max_num_faces=1,
-            refine_landmarks=False,  # Disabled to reduce memory
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-    return face_mesh
+mp_vision = mp.tasks.vision
+
+# MediaPipe Tasks FaceLandmarker model. When this file exists the Tasks API is
+# used instead of the legacy Face Mesh solution: it can run on the GPU delegate
+# and uses XNNPACK on CPU. Download it from:
+# https://storage.googleapis.com/mediapipe-models/face_landmarker/face_landmarker/float16/1/face_landmarker.task
+FACE_LANDMARKER_MODEL = os.environ.get(
+    'FACE_LANDMARKER_MODEL',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'face_landmarker.task')
+)
+use_face_landmarker = os.path.exists(FACE_LANDMARKER_MODEL)
+
+# Delegate for the FaceLandmarker: 'GPU' (default) or 'CPU'.
+# Falls back to CPU for all later connections if the GPU delegate fails.
+face_landmarker_delegate = os.environ.get('MEDIAPIPE_DELEGATE', 'GPU').upper()
+if face_landmarker_delegate not in ('GPU', 'CPU'):
+    logger.warning("Unknown MEDIAPIPE_DELEGATE %r, using CPU", face_landmarker_delegate)
+    face_landmarker_delegate = 'CPU'
+
+
+def create_face_landmarker(delegate):
+    """Create a MediaPipe Tasks FaceLandmarker running on the given delegate."""
+    options = mp_vision.FaceLandmarkerOptions(
+        base_options=mp.tasks.BaseOptions(
+            model_asset_path=FACE_LANDMARKER_MODEL,
+            delegate=getattr(mp.tasks.BaseOptions.Delegate, delegate)
+        ),
+        # VIDEO mode is synchronous but keeps tracking state between frames
+        running_mode=mp_vision.RunningMode.VIDEO,
+        num_faces=1,
+        min_face_detection_confidence=0.5,
+        min_face_presence_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+    return mp_vision.FaceLandmarker.create_from_options(options)
+
+
+def create_face_mesh():
+    """Create a face landmark model (Tasks API or legacy Face Mesh) for a single connection."""
+    global face_landmarker_delegate
+    if use_face_landmarker:
+        if face_landmarker_delegate == 'GPU':
+            try:
+                return create_face_landmarker('GPU')
+            except (RuntimeError, NotImplementedError) as e:
+                # NotImplementedError: platform without GPU delegate support
+                # (e.g. Windows), RuntimeError: no usable GPU
+                logger.warning("GPU delegate unavailable, using CPU: %s", e)
+                face_landmarker_delegate = 'CPU'
+        return create_face_landmarker('CPU')
+    
+    return mp_face_mesh.FaceMesh(
+        max_num_faces=1,
+        refine_landmarks=False,  # Disabled to reduce memory
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+
+
+def detect_face_landmarks(session, rgb_frame):
+    """
+    Run the session's face landmark model on an RGB frame.
+    
+    Args:
+        session: Per-connection state dict from create_session()
+        rgb_frame: C-contiguous RGB image (uint8)
+    
+    Returns:
+        Sequence of normalized landmarks (with .x/.y) for the first face,
+        or None if no face was detected
+    """
+    if use_face_landmarker:
+        # VIDEO mode requires strictly increasing timestamps per landmarker
+        timestamp_ms = max(int(time.monotonic() * 1000), session['timestamp_ms'] + 1)
+        session['timestamp_ms'] = timestamp_ms
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
+        result = session['face_mesh'].detect_for_video(mp_image, timestamp_ms)
+        return result.face_landmarks[0] if result.face_landmarks else None
+    
+    results = session['face_mesh'].process(rgb_frame)
+    if not results.multi_face_landmarks:
+        return None
+    return results.multi_face_landmarks[0].landmark
+
+# Frames wider than this are downscaled (keeping aspect ratio) before inference.
+# Landmarks are returned normalized (0-1), so the geometry math is unaffected.
+MAX_INFERENCE_WIDTH = 320
 
 # =============================================================================
 # TEMPORAL DETECTION COUNTERS
@@ -73,14 +298,70 @@ def get_face_mesh():
 # Thresholds
 EAR_THRESHOLD = 0.22  # Eyes considered closed below this value
 MAR_THRESHOLD = 0.6   # Mouth considered yawning above this value
+HEAD_TURN_THRESHOLD = 0.30  # Nose offset (fraction of face width) for distraction
+
+# Frame skipping: if an 8x8 grayscale thumbnail differs from the last analyzed
+# frame by less than this mean absolute difference (0-255 scale), the previous
+# metrics are reused instead of running MediaPipe again.
+MOTION_THRESHOLD = 3.0
+# Force a fresh inference after this many reused frames
+MAX_SKIPPED_FRAMES = 2
 
 # Frame counters for temporal detection
 DROWSY_FRAME_THRESHOLD = 10   # ~2 seconds at 5 FPS
 YAWN_FRAME_THRESHOLD = 8      # ~1.6 seconds at 5 FPS
+# The counters themselves live in each connection's session state
 
-# Global counters (will be updated per connection)
-drowsy_counter = 0
-yawn_counter = 0
+# =============================================================================
+# PER-CONNECTION STATE
+# =============================================================================
+# Keyed by Socket.IO session id (request.sid). Holds reusable frame buffers so
+# the per-frame hot path doesn't allocate a fresh full-size image every time,
+# plus the single-slot queue feeding that connection's inference worker.
+sessions = {}
+
+
+def create_session(sid):
+    """
+    Create the state dict for a newly connected Socket.IO session.
+    
+    Only called from the connect handler, so a late event from a client
+    that already disconnected can never recreate its session. Creating a
+    session also starts its background inference worker, which loads the
+    session's Face Mesh instance.
+    """
+    session = sessions.get(sid)
+    if session is None:
+        session = sessions[sid] = {
+            'small_buf': None,  # Reused downscaled frame
+            'rgb_buf': None,  # Reused RGB frame for MediaPipe input
+            'face_mesh': None,  # Created by frame_worker()
+            'timestamp_ms': 0,  # Last FaceLandmarker timestamp (Tasks API only)
+            'xy_buf': None,  # Reused (2, N) landmark coordinate array
+            # Temporal detection counters
+            'drowsy_counter': 0,
+            'yawn_counter': 0,
+            # Frame skipping: thumbnail and metrics of the last analyzed frame
+            'prev_thumb': None,
+            'last_metrics': None,
+            'skipped_frames': 0,
+            # Latest frame waiting for inference (older frames are dropped)
+            'frame_queue': socketio.server.eio.create_queue(maxsize=1),
+        }
+        socketio.start_background_task(frame_worker, sid, session)
+    return session
+
+
+def put_latest(frame_queue, item):
+    """Put an item in a single-slot queue, replacing any stale item in it."""
+    try:
+        frame_queue.put_nowait(item)
+    except queue.Full:
+        try:
+            frame_queue.get_nowait()
+        except queue.Empty:
+            pass
+        frame_queue.put_nowait(item)
 
 # =============================================================================
 # FACIAL LANDMARK INDICES
@@ -113,22 +394,75 @@ CHIN = 152
 LEFT_EYE_CORNER = 33
 RIGHT_EYE_CORNER = 263
 
+# EAR point pairs, relative to the 6-point eye arrays above, split into
+# "A" and "B" endpoint arrays so each distance is a single A - B subtraction
+# Vertical: P2-P6 and P3-P5, Horizontal: P1-P4
+EAR_V_A = np.array([1, 2])
+EAR_V_B = np.array([5, 4])
+EAR_H_A = 0
+EAR_H_B = 3
+
+# The same EAR pairs as absolute Face Mesh landmark indices for each eye
+LEFT_EYE_IDX = np.array(LEFT_EYE)
+RIGHT_EYE_IDX = np.array(RIGHT_EYE)
+LEFT_EAR_V_A = LEFT_EYE_IDX[EAR_V_A]
+LEFT_EAR_V_B = LEFT_EYE_IDX[EAR_V_B]
+LEFT_EAR_H_A = LEFT_EYE[EAR_H_A]
+LEFT_EAR_H_B = LEFT_EYE[EAR_H_B]
+RIGHT_EAR_V_A = RIGHT_EYE_IDX[EAR_V_A]
+RIGHT_EAR_V_B = RIGHT_EYE_IDX[EAR_V_B]
+RIGHT_EAR_H_A = RIGHT_EYE[EAR_H_A]
+RIGHT_EAR_H_B = RIGHT_EYE[EAR_H_B]
+
+# MAR point pairs, as absolute Face Mesh landmark indices
+# Vertical: upper/lower lip at center (13-14), left (82-87) and right (312-317)
+# Horizontal: mouth corners (61-291)
+MAR_V_A = np.array([13, 82, 312])
+MAR_V_B = np.array([14, 87, 317])
+MAR_H_A = 61
+MAR_H_B = 291
+
 
-def calculate_distance(point1, point2):
+# =============================================================================
+# GEOMETRY
+# =============================================================================
+# Written as scalar loops over the (2, N) landmark array so that, when Numba
+# is installed, all of it is compiled to native code (see the end of this
+# section). Without Numba the same functions run as plain Python.
+
+def aspect_ratio(xy, v_a, v_b, h_a, h_b):
     """
-    Calculate Euclidean distance between two 2D points.
+    Average of vertical/horizontal distance ratios (the EAR/MAR formula).
+    
+    Computed as mean(sqrt(v² / h²)), so the horizontal distance never needs
+    its own square root.
     
     Args:
-        point1: Tuple (x, y) coordinates
-        point2: Tuple (x, y) coordinates
+        xy: (2, N) float32 array of landmark pixel coordinates (row 0: x, row 1: y)
+        v_a, v_b: Arrays of landmark indices for the vertical point pairs
+        h_a, h_b: Landmark indices of the horizontal point pair
     
     Returns:
-        float: Euclidean distance
+        float: mean(||v_a - v_b|| / ||h_a - h_b||), or 0.0 for zero width
     """
-    return np.sqrt((point1[0] - point2[0])**2 + (point1[1] - point2[1])**2)
+    hx = xy[0, h_a] - xy[0, h_b]
+    hy = xy[1, h_a] - xy[1, h_b]
+    horizontal_sq = hx * hx + hy * hy
+    
+    # Avoid division by zero
+    if horizontal_sq == 0.0:
+        return 0.0
+    
+    total = 0.0
+    for k in range(v_a.shape[0]):
+        vx = xy[0, v_a[k]] - xy[0, v_b[k]]
+        vy = xy[1, v_a[k]] - xy[1, v_b[k]]
+        total += np.sqrt((vx * vx + vy * vy) / horizontal_sq)
+    
+    return total / v_a.shape[0]
 
 
-def calculate_ear(eye_landmarks, landmarks, img_width, img_height):
+def calculate_ear(xy, v_a, v_b, h_a, h_b):
     """
     Calculate Eye Aspect Ratio (EAR) for drowsiness detection.
     
@@ -165,42 +499,19 @@ def calculate_ear(eye_landmarks, landmarks, img_width, img_height):
         - Quick dips below threshold → Normal blinking
     
     Args:
-        eye_landmarks: List of 6 landmark indices for one eye
-        landmarks: MediaPipe face landmarks object
-        img_width: Width of the input image
-        img_height: Height of the input image
+        xy: (2, N) array of landmark pixel coordinates (row 0: x, row 1: y)
+        v_a, v_b: Landmark indices of P2/P3 and P6/P5 for one eye
+        h_a, h_b: Landmark indices of P1 and P4 for one eye
     
     Returns:
         float: Eye Aspect Ratio value
     """
-    # Extract (x, y) coordinates for each eye landmark
-    # MediaPipe returns normalized coordinates (0-1), so we scale to pixel values
-    coords = []
-    for idx in eye_landmarks:
-        lm = landmarks[idx]
-        coords.append((lm.x * img_width, lm.y * img_height))
-    
-    # Calculate vertical distances (numerator)
-    # P2-P6: Upper to lower on left side of eye
-    vertical_1 = calculate_distance(coords[1], coords[5])
-    # P3-P5: Upper to lower on right side of eye
-    vertical_2 = calculate_distance(coords[2], coords[4])
-    
-    # Calculate horizontal distance (denominator)
-    # P1-P4: Left corner to right corner
-    horizontal = calculate_distance(coords[0], coords[3])
-    
-    # Avoid division by zero
-    if horizontal == 0:
-        return 0.0
-    
-    # EAR formula
-    ear = (vertical_1 + vertical_2) / (2.0 * horizontal)
-    
-    return ear
+    # Mean of the two vertical distances over the horizontal one,
+    # i.e. (||P2 - P6|| + ||P3 - P5||) / (2 * ||P1 - P4||)
+    return aspect_ratio(xy, v_a, v_b, h_a, h_b)
 
 
-def calculate_mar(landmarks, img_width, img_height):
+def calculate_mar(xy):
     """
     Calculate Mouth Aspect Ratio (MAR) for yawning detection.
     
@@ -229,9 +540,7 @@ def calculate_mar(landmarks, img_width, img_height):
         - Yawning: MAR > 0.6 (mouth is wide open vertically)
     
     Args:
-        landmarks: MediaPipe face landmarks object
-        img_width: Width of the input image
-        img_height: Height of the input image
+        xy: (2, N) array of landmark pixel coordinates (row 0: x, row 1: y)
     
     Returns:
         float: Mouth Aspect Ratio value
@@ -243,41 +552,11 @@ def calculate_mar(landmarks, img_width, img_height):
     # Right corner: 291
     # Additional vertical points: 82, 312 (upper), 87, 317 (lower)
     
-    def get_coord(idx):
-        lm = landmarks[idx]
-        return (lm.x * img_width, lm.y * img_height)
-    
-    # Mouth corners (horizontal reference)
-    left_corner = get_coord(61)
-    right_corner = get_coord(291)
-    
-    # Vertical points
-    upper_center = get_coord(13)
-    lower_center = get_coord(14)
-    upper_left = get_coord(82)
-    lower_left = get_coord(87)
-    upper_right = get_coord(312)
-    lower_right = get_coord(317)
-    
-    # Calculate vertical distances
-    vertical_center = calculate_distance(upper_center, lower_center)
-    vertical_left = calculate_distance(upper_left, lower_left)
-    vertical_right = calculate_distance(upper_right, lower_right)
-    
-    # Calculate horizontal distance
-    horizontal = calculate_distance(left_corner, right_corner)
-    
-    # Avoid division by zero
-    if horizontal == 0:
-        return 0.0
-    
     # MAR formula (average of three vertical measurements)
-    mar = (vertical_center + vertical_left + vertical_right) / (3.0 * horizontal)
-    
-    return mar
+    return aspect_ratio(xy, MAR_V_A, MAR_V_B, MAR_H_A, MAR_H_B)
 
 
-def estimate_head_pose(landmarks, img_width, img_height):
+def estimate_head_pose(xy):
     """
     Estimate head pose to detect if user is looking away (distracted).
     
@@ -285,62 +564,146 @@ def estimate_head_pose(landmarks, img_width, img_height):
     to estimate if the face is turned significantly to the side.
     
     Args:
-        landmarks: MediaPipe face landmarks object
-        img_width: Width of the input image
-        img_height: Height of the input image
+        xy: (2, N) array of landmark pixel coordinates (row 0: x, row 1: y)
     
     Returns:
         bool: True if user appears distracted (looking away), False otherwise
     """
-    def get_coord(idx):
-        lm = landmarks[idx]
-        return (lm.x * img_width, lm.y * img_height)
-    
-    # Get key facial landmarks
-    nose = get_coord(NOSE_TIP)
-    left_eye = get_coord(LEFT_EYE_CORNER)
-    right_eye = get_coord(RIGHT_EYE_CORNER)
+    # Get key facial landmarks (only x coordinates are needed)
+    nose_x = xy[0, NOSE_TIP]
+    left_eye_x = xy[0, LEFT_EYE_CORNER]
+    right_eye_x = xy[0, RIGHT_EYE_CORNER]
     
     # Calculate the center of the eyes
-    eye_center_x = (left_eye[0] + right_eye[0]) / 2
+    eye_center_x = (left_eye_x + right_eye_x) / 2.0
     
     # Calculate horizontal offset of nose from eye center
     # If the nose is significantly off-center, the person is looking away
-    face_width = abs(right_eye[0] - left_eye[0])
+    face_width = abs(right_eye_x - left_eye_x)
     
-    if face_width == 0:
+    if face_width == 0.0:
         return False
     
     # Nose offset as percentage of face width
-    nose_offset = abs(nose[0] - eye_center_x) / face_width
+    nose_offset = abs(nose_x - eye_center_x) / face_width
     
     # If nose is more than 30% off-center, consider distracted
     # This accounts for significant head turns
-    distracted = nose_offset > 0.30
+    return nose_offset > HEAD_TURN_THRESHOLD
+
+
+def analyze_landmarks(xy):
+    """
+    Compute all per-frame metrics for one face in a single call.
     
-    return distracted
+    Head pose is checked first: a turned-away face gives no meaningful
+    eye/mouth signal, so EAR/MAR are skipped and reported as 0.0.
+    
+    Args:
+        xy: (2, N) float32 array of landmark pixel coordinates
+    
+    Returns:
+        tuple: (avg_ear, mar, is_distracted)
+    """
+    if estimate_head_pose(xy):
+        return 0.0, 0.0, True
+    
+    # Calculate Eye Aspect Ratio for both eyes
+    left_ear = calculate_ear(xy, LEFT_EAR_V_A, LEFT_EAR_V_B,
+                             LEFT_EAR_H_A, LEFT_EAR_H_B)
+    right_ear = calculate_ear(xy, RIGHT_EAR_V_A, RIGHT_EAR_V_B,
+                              RIGHT_EAR_H_A, RIGHT_EAR_H_B)
+    avg_ear = (left_ear + right_ear) / 2.0
+    
+    # Calculate Mouth Aspect Ratio
+    mar = calculate_mar(xy)
+    
+    return avg_ear, mar, False
+
+
+if njit is not None:
+    aspect_ratio = njit(cache=True, fastmath=True)(aspect_ratio)
+    calculate_ear = njit(cache=True, fastmath=True)(calculate_ear)
+    calculate_mar = njit(cache=True, fastmath=True)(calculate_mar)
+    estimate_head_pose = njit(cache=True, fastmath=True)(estimate_head_pose)
+    analyze_landmarks = njit(cache=True, fastmath=True)(analyze_landmarks)
+    # Compile now (or load from the on-disk cache) so the first client frame
+    # doesn't pay the compilation cost
+    analyze_landmarks(np.zeros((2, 468), dtype=np.float32))
 
 
-def process_frame(frame_data):
+def compute_face_metrics(session, rgb_frame, img_width, img_height):
+    """
+    Run MediaPipe on a frame and compute the per-frame metrics.
+    
+    Args:
+        session: Per-connection state dict from create_session()
+        rgb_frame: RGB image passed to MediaPipe (possibly downscaled)
+        img_width: Width of the original frame
+        img_height: Height of the original frame
+    
+    Returns:
+        tuple: (avg_ear, mar, is_distracted), or None if no face was detected.
+               When distracted, EAR/MAR are not computed and are 0.0
+    """
+    # Process frame with this connection's MediaPipe model and
+    # get the first detected face
+    face_landmarks = detect_face_landmarks(session, rgb_frame)
+    
+    if face_landmarks is None:
+        return None
+    
+    # Convert landmarks once per frame into the session's (2, N)
+    # structure-of-arrays buffer: row 0 holds every x, row 1 every y, so each
+    # coordinate gather reads one contiguous row. This is the only place that
+    # reads the MediaPipe landmark objects, everything below works on the
+    # array. MediaPipe returns normalized coordinates (0-1), so we scale to
+    # pixel values
+    num_landmarks = len(face_landmarks)
+    xy = session['xy_buf']
+    if xy is None or xy.shape[1] != num_landmarks:
+        xy = session['xy_buf'] = np.empty((2, num_landmarks), dtype=np.float32)
+    xy.T[:] = [(lm.x, lm.y) for lm in face_landmarks]
+    xy[0] *= img_width
+    xy[1] *= img_height
+    
+    # EAR, MAR and head pose in one call (native code when Numba is installed)
+    avg_ear, mar, is_distracted = analyze_landmarks(xy)
+    return float(avg_ear), float(mar), bool(is_distracted)
+
+
+def process_frame(frame_data, session):
     """
     Process a single frame from the webcam and analyze behavior.
     
     Args:
-        frame_data: Base64 encoded image data from webcam
+        frame_data: JPEG bytes from webcam (or a base64 data URL from older clients)
+        session: Per-connection state dict from create_session()
     
     Returns:
-        dict: Analysis results containing status, EAR, and MAR scores
+        dict: Analysis results containing status and EAR/MAR scores
+              (as integers scaled by 1000, or None when not computed)
     """
     try:
-        # Decode base64 image
-        # Remove header if present (e.g., "data:image/jpeg;base64,")
-        if ',' in frame_data:
-            frame_data = frame_data.split(',')[1]
+        if isinstance(frame_data, str):
+            # Older clients send a base64 data URL
+            # Remove header if present (e.g., "data:image/jpeg;base64,")
+            if ',' in frame_data:
+                frame_data = frame_data.split(',', 1)[1]
+            img_bytes = base64.b64decode(frame_data)
+        else:
+            # Binary Socket.IO attachment: raw JPEG bytes, no decoding needed
+            img_bytes = frame_data
         
-        # Convert base64 to numpy array
-        img_bytes = base64.b64decode(frame_data)
-        nparr = np.frombuffer(img_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        if turbo_jpeg is not None:
+            # Decode directly to RGB, no separate color conversion needed
+            frame = turbo_jpeg.decode(img_bytes, pixel_format=TJPF_RGB)
+            is_rgb = True
+        else:
+            # Wrap the JPEG bytes in a numpy array (no copy)
+            nparr = np.frombuffer(img_bytes, np.uint8)
+            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            is_rgb = False
         
         if frame is None:
             return None
@@ -348,55 +711,78 @@ def process_frame(frame_data):
         # Get frame dimensions
         img_height, img_width = frame.shape[:2]
         
-        # Convert BGR to RGB for MediaPipe
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        # Downscale large frames before inference to cut MediaPipe's cost.
+        # img_width/img_height keep the original size for the geometry math.
+        if img_width > MAX_INFERENCE_WIDTH:
+            small_width = MAX_INFERENCE_WIDTH
+            small_height = max(1, round(img_height * MAX_INFERENCE_WIDTH / img_width))
+            small_buf = session['small_buf']
+            if small_buf is None or small_buf.shape[:2] != (small_height, small_width):
+                small_buf = session['small_buf'] = np.empty(
+                    (small_height, small_width, 3), dtype=np.uint8
+                )
+            cv2.resize(frame, (small_width, small_height), dst=small_buf,
+                       interpolation=cv2.INTER_AREA)
+            frame = small_buf
+        
+        if is_rgb:
+            rgb_frame = frame
+        else:
+            # Convert BGR to RGB for MediaPipe into the session's reusable buffer
+            # (reallocated only when the incoming frame size changes)
+            rgb_frame = session['rgb_buf']
+            if rgb_frame is None or rgb_frame.shape != frame.shape:
+                rgb_frame = session['rgb_buf'] = np.empty(frame.shape, dtype=np.uint8)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_frame)
         
-        # Process frame with MediaPipe Face Mesh (lazy loaded)
-        results = get_face_mesh().process(rgb_frame)
+        # Skip MediaPipe when the frame is nearly identical to the last
+        # analyzed one (user sitting still). Comparing against the last
+        # analyzed frame rather than the previous one stops slow drift from
+        # accumulating unnoticed.
+        thumb = cv2.cvtColor(
+            cv2.resize(rgb_frame, (8, 8), interpolation=cv2.INTER_AREA),
+            cv2.COLOR_RGB2GRAY
+        )
+        prev_thumb = session['prev_thumb']
+        reused = (prev_thumb is not None
+                  and session['skipped_frames'] < MAX_SKIPPED_FRAMES
+                  and cv2.absdiff(prev_thumb, thumb).mean() < MOTION_THRESHOLD)
+        if reused:
+            session['skipped_frames'] += 1
+            metrics = session['last_metrics']
+            # Counters are only updated on analyzed frames
+            elapsed_frames = 0
+        else:
+            # Frames covered by this measurement: this one plus the ones
+            # skipped since the last analyzed frame
+            elapsed_frames = 1 + session['skipped_frames']
+            metrics = compute_face_metrics(session, rgb_frame, img_width, img_height)
+            session['prev_thumb'] = thumb
+            session['last_metrics'] = metrics
+            session['skipped_frames'] = 0
         
-        if not results.multi_face_landmarks:
+        if metrics is None:
             # No face detected
             return {
                 'status': 'No Face Detected',
-                'ear_score': 0.0,
-                'mar_score': 0.0
+                'ear_x1000': None,
+                'mar_x1000': None
             }
         
-        # Get the first detected face
-        face_landmarks = results.multi_face_landmarks[0].landmark
-        
-        # Calculate Eye Aspect Ratio for both eyes
-        left_ear = calculate_ear(LEFT_EYE, face_landmarks, img_width, img_height)
-        right_ear = calculate_ear(RIGHT_EYE, face_landmarks, img_width, img_height)
-        avg_ear = (left_ear + right_ear) / 2.0
-        
-        # Calculate Mouth Aspect Ratio
-        mar = calculate_mar(face_landmarks, img_width, img_height)
+        avg_ear, mar, is_distracted = metrics
         
-        # Check for distraction (head turned away)
-        is_distracted = estimate_head_pose(face_landmarks, img_width, img_height)
-        
-        # Access global counters for temporal detection
-        global drowsy_counter, yawn_counter
+        # Load this connection's counters for temporal detection
+        drowsy_counter = session['drowsy_counter']
+        yawn_counter = session['yawn_counter']
         
         # =============================================================
         # TEMPORAL DETECTION LOGIC
         # =============================================================
         # Instead of flagging drowsy on a single frame (which catches blinks),
         # we count consecutive frames where EAR/MAR exceeds threshold.
-        # Only trigger alert after sustained behavior.
-        
-        # Update drowsy counter based on EAR
-        if avg_ear < EAR_THRESHOLD:
-            drowsy_counter += 1
-        else:
-            drowsy_counter = 0  # Reset if eyes open
-        
-        # Update yawn counter based on MAR
-        if mar > MAR_THRESHOLD:
-            yawn_counter += 1
-        else:
-            yawn_counter = 0  # Reset if mouth closes
+        # Only trigger alert after sustained behavior. Reused (skipped)
+        # frames carry no new measurement: the next analyzed frame advances
+        # the counters for them too, so the thresholds keep their timing.
         
         # Determine status based on metrics with temporal smoothing
         # Priority: Distracted > Yawning > Drowsy > Attentive
@@ -404,27 +790,93 @@ def process_frame(frame_data):
         
         if is_distracted:
             status = 'Distracted'
-            # Reset counters when distracted
+            # Reset counters when distracted (EAR/MAR weren't computed)
             drowsy_counter = 0
             yawn_counter = 0
-        elif yawn_counter >= YAWN_FRAME_THRESHOLD:
-            # Sustained high MAR indicates genuine yawning
-            status = 'Yawning'
-        elif drowsy_counter >= DROWSY_FRAME_THRESHOLD:
-            # Sustained low EAR indicates drowsiness (not just a blink)
-            status = 'Drowsy'
+        else:
+            if elapsed_frames:
+                # Update drowsy counter based on EAR
+                if avg_ear < EAR_THRESHOLD:
+                    drowsy_counter += elapsed_frames
+                else:
+                    drowsy_counter = 0  # Reset if eyes open
+                
+                # Update yawn counter based on MAR
+                if mar > MAR_THRESHOLD:
+                    yawn_counter += elapsed_frames
+                else:
+                    yawn_counter = 0  # Reset if mouth closes
+            
+            if yawn_counter >= YAWN_FRAME_THRESHOLD:
+                # Sustained high MAR indicates genuine yawning
+                status = 'Yawning'
+            elif drowsy_counter >= DROWSY_FRAME_THRESHOLD:
+                # Sustained low EAR indicates drowsiness (not just a blink)
+                status = 'Drowsy'
+        
+        session['drowsy_counter'] = drowsy_counter
+        session['yawn_counter'] = yawn_counter
         
         return {
             'status': status,
-            'ear_score': round(avg_ear, 3),
-            'mar_score': round(mar, 3)
+            # Scores are sent as fixed-point integers (value * 1000);
+            # the client divides by 1000 for display
+            # EAR/MAR aren't computed when distracted: send null so the
+            # client keeps its previous values instead of showing 0
+            'ear_x1000': None if is_distracted else int(avg_ear * 1000),
+            'mar_x1000': None if is_distracted else int(mar * 1000)
         }
         
     except Exception as e:
-        print(f"Error processing frame: {e}")
+        logger.error("Error processing frame: %s", e)
         return None
 
 
+def frame_worker(sid, session):
+    """
+    Background inference loop for a single connection.
+    
+    Waits for the most recent frame in the session's queue, processes it and
+    emits the result to that client only. Frames that arrive while a frame is
+    being processed replace each other, so the client always gets results for
+    its newest frame instead of a growing backlog. A None item stops the loop
+    and releases the session's Face Mesh, which the worker also creates.
+    
+    The loop itself is a green thread, but the decode and inference run on
+    an OS thread via tpool, so the eventlet hub keeps serving other clients'
+    events and HTTP requests meanwhile (MediaPipe releases the GIL).
+    
+    Args:
+        sid: Socket.IO session id of the client
+        session: Per-connection state dict from create_session()
+    """
+    # Load the model on an OS thread: it can take a while (and may try the
+    # GPU delegate first), which would otherwise stall the eventlet hub
+    try:
+        session['face_mesh'] = tpool.execute(create_face_mesh)
+    except Exception as e:
+        logger.error("Could not load face landmark model: %s", e)
+        return
+    
+    frame_queue = session['frame_queue']
+    while True:
+        frame_data = frame_queue.get()
+        if frame_data is None:
+            break
+        
+        # Only this worker touches the session's buffers and model, so
+        # running process_frame on a tpool thread is safe
+        result = tpool.execute(process_frame, frame_data, session)
+        
+        if result:
+            # Emit status update to the client
+            socketio.emit('status_update', result, to=sid)
+    
+    # Closed here rather than in the disconnect handler so it is never
+    # released while a frame is still being processed
+    tpool.execute(session['face_mesh'].close)
+
+
 # =============================================================================
 # SOCKET.IO EVENT HANDLERS
 # =============================================================================
@@ -432,14 +884,19 @@ def process_frame(frame_data):
 @socketio.on('connect')
 def handle_connect():
     """Handle new client connections."""
-    print('Client connected')
+    logger.info('Client connected')
+    create_session(request.sid)
     emit('connection_response', {'status': 'connected'})
 
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnections."""
-    print('Client disconnected')
+    logger.info('Client disconnected')
+    session = sessions.pop(request.sid, None)
+    if session is not None:
+        # Stop the session's inference worker
+        put_latest(session['frame_queue'], None)
 
 
 @socketio.on('video_frame')
@@ -447,20 +904,23 @@ def handle_video_frame(data):
     """
     Handle incoming video frames from the frontend.
     
-    Receives a base64-encoded frame, processes it through MediaPipe,
-    and emits the analysis results back to the client.
+    Receives a JPEG frame as a binary attachment and hands it to the
+    connection's inference worker, which processes it through MediaPipe
+    and emits the analysis results back to the client. If the worker is
+    still busy, the newest frame replaces any frame already waiting.
     
     Args:
-        data: Dictionary containing 'frame' key with base64 image data
+        data: Dictionary containing 'frame' key with JPEG bytes
+              (base64 data URLs are still accepted for older clients)
     """
     frame_data = data.get('frame')
     
-    if frame_data:
-        result = process_frame(frame_data)
-        
-        if result:
-            # Emit status update to the client
-            emit('status_update', result)
+    # Drop frames for sessions that were already closed (the handler can
+    # run after the disconnect handler has removed the session)
+    session = sessions.get(request.sid)
+    
+    if frame_data and session is not None:
+        put_latest(session['frame_queue'], frame_data)
 
 
 # =============================================================================
@@ -495,15 +955,23 @@ def register():
         return jsonify({'error': 'User already exists'}), 400
     
     # Hash password with bcrypt
-    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-    
-    # Store user
-    users_db[email] = {
-        'password_hash': password_hash,
-        'name': name
-    }
+    # bcrypt is deliberately slow, so run it on a real OS thread via tpool to
+    # keep the eventlet hub (and every other client) responsive meanwhile
+    password_hash = tpool.execute(
+        bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    )
+    
+    # Store user (re-check under the lock: another request may have
+    # registered the same email while we were hashing)
+    with users_lock:
+        if email in users_db:
+            return jsonify({'error': 'User already exists'}), 400
+        users_db[email] = {
+            'password_hash': password_hash,
+            'name': name
+        }
     
-    print(f"New user registered: {email}")
+    logger.info("New user registered: %s", email)
     return jsonify({'message': 'User registered successfully'}), 201
 
 
@@ -536,13 +1004,13 @@ def login():
         return jsonify({'error': 'Invalid credentials'}), 401
     
     # Verify password
-    if not bcrypt.checkpw(password.encode('utf-8'), user['password_hash']):
+    if not check_password(email, password, user['password_hash']):
         return jsonify({'error': 'Invalid credentials'}), 401
     
     # Create JWT token
     access_token = create_access_token(identity=email)
     
-    print(f"User logged in: {email}")
+    logger.info("User logged in: %s", email)
     return jsonify({
         'access_token': access_token,
         'user': {
@@ -596,4 +1064,6 @@ if __name__ == '__main__':
     
     # Run the Flask-SocketIO server
     # Use eventlet for async WebSocket support
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True)
+    # Debug mode (reloader + per-request logging) only when FLASK_DEBUG=1
+    debug = os.environ.get('FLASK_DEBUG', '0') == '1'
+    socketio.run(app, host='0.0.0.0', port=5000, debug=debug)
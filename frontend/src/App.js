@@ -33,6 +33,11 @@ const SOCKET_SERVER_URL = process.env.REACT_APP_API_URL || 'http://localhost:500
 // Maximum data points to show in chart
 const MAX_CHART_POINTS = 30;
 
+// JPEG encoding for frames sent to the backend (shared by the Webcam
+// screenshot props and the binary capture path)
+const FRAME_FORMAT = 'image/jpeg';
+const FRAME_QUALITY = 0.6;
+
 // Status color mapping
 const STATUS_COLORS = {
     'Attentive': '#00ff88',
@@ -94,11 +99,20 @@ function App() {
 
         // Status update handler - receives analysis results from backend
         socketRef.current.on('status_update', (data) => {
-            const { status, ear_score, mar_score } = data;
+            const { status, ear_x1000, mar_x1000 } = data;
+
+            // Scores arrive as fixed-point integers (value * 1000), or null
+            // when they weren't computed (head turned away)
+            const hasScores = ear_x1000 !== null && mar_x1000 !== null;
+            const ear_score = hasScores ? ear_x1000 / 1000 : null;
+            const mar_score = hasScores ? mar_x1000 / 1000 : null;
 
             setCurrentStatus(status);
-            setEarScore(ear_score);
-            setMarScore(mar_score);
+            if (hasScores) {
+                // Otherwise keep showing the previous values
+                setEarScore(ear_score);
+                setMarScore(mar_score);
+            }
 
             // Calculate attentiveness score (0-100)
             let attentivenessScore = 100;
@@ -119,8 +133,9 @@ function App() {
                 const newData = [...prevData, {
                     time: timestamp,
                     score: Math.round(attentivenessScore),
-                    ear: ear_score * 100,
-                    mar: mar_score * 100
+                    // null leaves a gap instead of plotting a fake 0
+                    ear: hasScores ? ear_score * 100 : null,
+                    mar: hasScores ? mar_score * 100 : null
                 }];
                 return newData.slice(-MAX_CHART_POINTS);
             });
@@ -154,9 +169,14 @@ function App() {
      */
     const captureFrame = useCallback(() => {
         if (webcamRef.current && socketRef.current && socketRef.current.connected) {
-            const imageSrc = webcamRef.current.getScreenshot();
-            if (imageSrc) {
-                socketRef.current.emit('video_frame', { frame: imageSrc });
+            const canvas = webcamRef.current.getCanvas();
+            if (canvas) {
+                // Send raw JPEG bytes as a binary attachment (no base64 overhead)
+                canvas.toBlob((blob) => {
+                    if (blob && socketRef.current && socketRef.current.connected) {
+                        socketRef.current.emit('video_frame', { frame: blob });
+                    }
+                }, FRAME_FORMAT, FRAME_QUALITY);
             }
         }
     }, []);
@@ -390,8 +410,8 @@ function App() {
                         <Webcam
                             ref={webcamRef}
                             audio={false}
-                            screenshotFormat="image/jpeg"
-                            screenshotQuality={0.6}
+                            screenshotFormat={FRAME_FORMAT}
+                            screenshotQuality={FRAME_QUALITY}
                             videoConstraints={{
                                 width: 640,
                                 height: 480,